@@ -5,16 +5,86 @@ Sends emails via SMTP with clean logging
 """
 
 import asyncio
+import email.policy
+import logging
 import os
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from typing import Dict
+import random
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from email.message import EmailMessage
+from email.utils import formataddr
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
 
+import aiosmtplib
 import mcp.types as types
+from cachetools import TTLCache
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
-from supabase import create_client, Client
+from postgrest.exceptions import APIError
+from supabase import acreate_client, AsyncClient
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(message)s")
+logger = logging.getLogger("email-orchestrator")
+
+# SMTP connection pool limits
+SMTP_IDLE_TIMEOUT = 60  # seconds an idle pooled connection is kept open
+MAX_MESSAGES_PER_CONNECTION = 100
+
+# Retries for transient (4xx) SMTP replies: 100 ms, 400 ms, ... with ±20% jitter
+SEND_ATTEMPTS = 3
+SEND_RETRY_BASE_DELAY = 0.1  # seconds
+
+# Loose address check applied to artifact recipients before sending. Use with
+# fullmatch: addresses are spliced into raw header bytes, so only printable
+# ASCII other than "@" is allowed (no whitespace, no trailing newline)
+_EMAIL_RE = re.compile(r"[\x21-\x3f\x41-\x7e]+@[\x21-\x3f\x41-\x7e]+\.[\x21-\x3f\x41-\x7e]+")
+
+# Stand-in To address in pre-serialized bulk messages, swapped per recipient
+TO_PLACEHOLDER = b"PLACEHOLDER@invalid"
+# Anchored on the header line so a Subject containing the placeholder is left alone
+_TO_PLACEHOLDER_LINE = b"\nTo: " + TO_PLACEHOLDER
+
+# Email artifacts rarely change, so keep recently used ones in memory along
+# with their serialized bulk message
+ARTIFACT_CACHE_SIZE = 256
+ARTIFACT_CACHE_TTL = 300  # seconds
+
+
+def _smtp_code(exc: Exception) -> Optional[int]:
+    """Reply code behind an SMTP error, including a single refused RCPT"""
+    if isinstance(exc, aiosmtplib.SMTPRecipientsRefused) and exc.recipients:
+        return exc.recipients[0].code
+    if isinstance(exc, aiosmtplib.SMTPResponseException):
+        return exc.code
+    return None
+
+
+def _connection_lost(exc: Exception) -> bool:
+    """Whether an error leaves the SMTP connection unusable.
+
+    aiosmtplib issues RSET after a refused transaction, so other SMTP errors
+    leave the connection ready for the next message.
+    """
+    if isinstance(exc, (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPTimeoutError, OSError)):
+        return True
+    return _smtp_code(exc) == 421
+
+
+@dataclass
+class PooledSMTP:
+    """An SMTP connection tracked by the pool"""
+    conn: aiosmtplib.SMTP
+    handshaken: bool = False  # STARTTLS and AUTH already done
+    sent: int = 0
+    idle_since: float = 0.0
+
+
+@dataclass(frozen=True)
+class SerializedMessage:
+    """A bulk message serialized once, addressed to TO_PLACEHOLDER"""
+    eight_bit: bytes  # for servers advertising 8BITMIME
+    seven_bit: bytes  # non-ASCII parts re-encoded for servers without it
 
 
 class EmailOrchestrator:
@@ -28,47 +98,302 @@ class EmailOrchestrator:
         # Supabase configuration
         self.supabase_url = os.getenv("SUPABASE_URL")
         self.supabase_key = os.getenv("SUPABASE_KEY")
+        # Optional direct Postgres DSN (e.g. the pgbouncer pooler) for artifact lookups
+        self.supabase_pg_dsn = os.getenv("SUPABASE_PG_DSN")
         
         if not self.smtp_username or not self.smtp_password:
             raise ValueError("SMTP_USERNAME and SMTP_PASSWORD environment variables required")
             
         if not self.supabase_url or not self.supabase_key:
             raise ValueError("SUPABASE_URL and SUPABASE_KEY environment variables required")
+
+        # From never changes, so bulk messages splice in these prebuilt bytes
+        self._from_header_bytes = formataddr(("", self.smtp_username)).encode()
             
-        self.supabase: Client = create_client(self.supabase_url, self.supabase_key)
+        self.supabase: Optional[AsyncClient] = None
+        self._supabase_lock = asyncio.Lock()
+        self._pg_pool = None
+        self._pg_lock = asyncio.Lock()
+        self._artifact_cache = TTLCache(maxsize=ARTIFACT_CACHE_SIZE, ttl=ARTIFACT_CACHE_TTL)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        # SMTP connection pool: idle connections wait in the queue and the
+        # semaphore caps how many are checked out at once. The pool size is also
+        # the send concurrency, since every in-flight send holds a connection
+        self.smtp_pool_size = int(os.getenv("SMTP_POOL_SIZE", "5"))
+        self._pool: asyncio.Queue[PooledSMTP] = asyncio.Queue(maxsize=self.smtp_pool_size)
+        self._pool_sem = asyncio.Semaphore(self.smtp_pool_size)
+        self._reaper: Optional[asyncio.Task] = None
+
+
+    async def _ensure_async_sb(self) -> AsyncClient:
+        """Create the async Supabase client on first use"""
+        async with self._supabase_lock:
+            if self.supabase is None:
+                self.supabase = await acreate_client(self.supabase_url, self.supabase_key)
+        return self.supabase
 
+    async def _ensure_pg(self):
+        """Create the asyncpg pool on first use"""
+        async with self._pg_lock:
+            if self._pg_pool is None:
+                import asyncpg
+
+                # pgbouncer in transaction mode cannot keep prepared statements
+                self._pg_pool = await asyncpg.create_pool(
+                    self.supabase_pg_dsn, min_size=1, max_size=4, statement_cache_size=0
+                )
+        return self._pg_pool
 
     async def get_email_artifact(self, artifact_id: str) -> Dict:
         """Retrieve email artifact from Supabase"""
+        if self.supabase_pg_dsn:
+            return await self._fetch_email_artifact_pg(artifact_id)
+        return await self._fetch_email_artifact_rest(artifact_id)
+
+    async def _fetch_email_artifact_pg(self, artifact_id: str) -> Dict:
+        """Retrieve email artifact straight from Postgres"""
         try:
-            response = self.supabase.table("email_artifacts").select("*").eq("id", artifact_id).execute()
-            
-            if not response.data:
-                raise ValueError(f"Email artifact with ID {artifact_id} not found")
-                
-            return response.data[0]
-            
+            pool = await self._ensure_pg()
+            async with pool.acquire() as conn:
+                row = await conn.fetchrow(
+                    "SELECT id::text AS id, title, html_template FROM email_artifacts WHERE id = $1",
+                    artifact_id
+                )
+
         except Exception as e:
-            raise ValueError(f"Failed to retrieve email artifact: {str(e)}")
+            logger.exception("get_email_artifact failed artifact_id=%s", artifact_id)
+            raise ValueError(f"Failed to retrieve email artifact: {e}") from e
+
+        if row is None:
+            raise ValueError(f"Failed to retrieve email artifact: Email artifact with ID {artifact_id} not found")
+
+        return dict(row)
+
+    async def _fetch_email_artifact_rest(self, artifact_id: str) -> Dict:
+        """Retrieve email artifact through the Supabase REST API"""
+        try:
+            supabase = await self._ensure_async_sb()
+            response = await (
+                supabase.table("email_artifacts")
+                .select("id,title,html_template")
+                .eq("id", artifact_id)
+                .limit(1)
+                .single()
+                .execute()
+            )
+
+        except APIError as e:
+            # .single() reports a missing row as PGRST116
+            if e.code == "PGRST116":
+                raise ValueError(f"Failed to retrieve email artifact: Email artifact with ID {artifact_id} not found") from e
+            logger.exception("get_email_artifact failed artifact_id=%s", artifact_id)
+            raise ValueError(f"Failed to retrieve email artifact: {e}") from e
+
+        except Exception as e:
+            logger.exception("get_email_artifact failed artifact_id=%s", artifact_id)
+            raise ValueError(f"Failed to retrieve email artifact: {e}") from e
+
+        return response.data
+
+    async def get_prebuilt_artifact(self, artifact_id: str) -> Tuple[str, str, SerializedMessage]:
+        """Return an artifact's subject, HTML and serialized bulk message, served from cache when fresh"""
+        try:
+            return self._artifact_cache[artifact_id]
+        except KeyError:
+            pass
+
+        # Concurrent misses for the same artifact share one in-flight build
+        build = self._inflight.get(artifact_id)
+        if build is None:
+            build = asyncio.ensure_future(self._build_prebuilt_artifact(artifact_id))
+            self._inflight[artifact_id] = build
+            build.add_done_callback(lambda done: self._finish_inflight(artifact_id, done))
+
+        # Shield so one cancelled caller does not cancel the build for the others
+        return await asyncio.shield(build)
+
+    def _finish_inflight(self, artifact_id: str, build: asyncio.Future) -> None:
+        """Drop a finished build from _inflight and consume its exception.
+
+        If every waiting caller was cancelled nobody reads the exception, and
+        asyncio would log "Task exception was never retrieved".
+        """
+        self._inflight.pop(artifact_id, None)
+        if not build.cancelled():
+            build.exception()
+
+    async def _build_prebuilt_artifact(self, artifact_id: str) -> Tuple[str, str, SerializedMessage]:
+        """Fetch an artifact, serialize its bulk message and cache both together"""
+        artifact = await self.get_email_artifact(artifact_id)
+
+        # Extract email content from artifact
+        subject = artifact.get("title", "")
+        html_content = artifact.get("html_template", "")
+
+        if not subject or not html_content:
+            raise ValueError("Email artifact missing required fields: title or html_template")
+
+        prebuilt = (subject, html_content, self._serialize_bulk(subject, html_content))
+        self._artifact_cache[artifact_id] = prebuilt
+        return prebuilt
+
+    async def _open_smtp(self) -> PooledSMTP:
+        """Open a new SMTP connection; the handshake happens on first checkout"""
+        smtp = aiosmtplib.SMTP(hostname=self.smtp_server, port=self.smtp_port, start_tls=False)
+        try:
+            await smtp.connect()
+        except BaseException:
+            smtp.close()
+            raise
+        return PooledSMTP(conn=smtp)
+
+    async def _handshake(self, pooled: PooledSMTP) -> None:
+        """Upgrade a connection to TLS and log in; done once per socket"""
+        await pooled.conn.starttls()
+        await pooled.conn.login(self.smtp_username, self.smtp_password)
+        pooled.handshaken = True
+
+    async def _close_smtp(self, pooled: PooledSMTP, graceful: bool = True) -> None:
+        """Close an SMTP connection, sending QUIT first when it is still healthy"""
+        try:
+            if graceful and pooled.conn.is_connected:
+                await pooled.conn.quit()
+        except (aiosmtplib.SMTPException, OSError):
+            pass
+        finally:
+            pooled.conn.close()
+
+    async def _acquire(self) -> PooledSMTP:
+        """Check out a handshaken SMTP connection, opening a new one if none is usable"""
+        await self._pool_sem.acquire()
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap_idle_connections())
+
+        try:
+            while True:
+                try:
+                    pooled = self._pool.get_nowait()
+                except asyncio.QueueEmpty:
+                    pooled = await self._open_smtp()
+
+                try:
+                    if pooled.handshaken:
+                        # RSET both checks the socket is alive and clears any leftover
+                        # transaction, without repeating STARTTLS or AUTH
+                        await pooled.conn.rset()
+                    else:
+                        await self._handshake(pooled)
+                    return pooled
+
+                except (aiosmtplib.SMTPException, OSError):
+                    await self._close_smtp(pooled, graceful=False)
+                    # A stale pooled connection is skipped; a fresh one that fails is an error
+                    if not pooled.handshaken:
+                        raise
+
+                except BaseException:
+                    await self._close_smtp(pooled, graceful=False)
+                    raise
+
+        # BaseException so a cancelled caller still gives its slot back
+        except BaseException:
+            self._pool_sem.release()
+            raise
+
+    async def _release(self, pooled: PooledSMTP, failed: bool = False) -> None:
+        """Return a connection to the pool, or close it if it errored or hit its message cap"""
+        try:
+            if failed or pooled.sent >= MAX_MESSAGES_PER_CONNECTION or not pooled.conn.is_connected:
+                await self._close_smtp(pooled, graceful=not failed)
+                return
+
+            pooled.idle_since = asyncio.get_running_loop().time()
+            try:
+                self._pool.put_nowait(pooled)
+            except asyncio.QueueFull:
+                await self._close_smtp(pooled)
+
+        finally:
+            self._pool_sem.release()
+
+    async def _reap_idle_connections(self) -> None:
+        """Periodically close pooled connections that have been idle too long"""
+        while True:
+            await asyncio.sleep(SMTP_IDLE_TIMEOUT / 2)
+
+            now = asyncio.get_running_loop().time()
+            fresh, stale = [], []
+            while not self._pool.empty():
+                pooled = self._pool.get_nowait()
+                if now - pooled.idle_since >= SMTP_IDLE_TIMEOUT:
+                    stale.append(pooled)
+                else:
+                    fresh.append(pooled)
+
+            for pooled in fresh:
+                self._pool.put_nowait(pooled)
+
+            for pooled in stale:
+                await self._close_smtp(pooled)
+
+    async def _send_with_retry(self, send: Callable[[], Awaitable], to: str) -> None:
+        """Run one SMTP send, retrying transient 4xx replies on the same connection"""
+        for attempt in range(SEND_ATTEMPTS):
+            try:
+                await send()
+                return
+            except (aiosmtplib.SMTPResponseException, aiosmtplib.SMTPRecipientsRefused) as e:
+                # A 4xx on RCPT (greylisting, rate limits) arrives as SMTPRecipientsRefused.
+                # 421 means the server is closing the connection, so retrying on it is pointless
+                code = _smtp_code(e)
+                if code is not None and 400 <= code < 500 and code != 421 and attempt < SEND_ATTEMPTS - 1:
+                    delay = SEND_RETRY_BASE_DELAY * 4 ** attempt * random.uniform(0.8, 1.2)
+                    logger.warning("Transient SMTP error to=%s code=%s, retrying in %.2fs", to, code, delay)
+                    await asyncio.sleep(delay)
+                else:
+                    raise
+
+    def _build_message(self, to: str, subject: str, html_content: str, with_from: bool = True) -> EmailMessage:
+        """Build the MIME message for a single recipient"""
+        msg = EmailMessage()
+        msg['Subject'] = subject
+        if with_from:
+            msg['From'] = self.smtp_username
+        msg['To'] = to
+
+        # Plain-text fallback with the HTML as the preferred alternative
+        msg.set_content("HTML email — view in an HTML client.")
+        msg.add_alternative(html_content, subtype='html')
+        return msg
+
+    def _serialize_bulk(self, subject: str, html_content: str) -> SerializedMessage:
+        """Serialize a message addressed to TO_PLACEHOLDER for per-recipient patching"""
+        msg = self._build_message(TO_PLACEHOLDER.decode(), subject, html_content, with_from=False)
+        from_header = b"From: " + self._from_header_bytes + b"\n"
+        return SerializedMessage(
+            eight_bit=from_header + bytes(msg),
+            seven_bit=from_header + msg.as_bytes(policy=email.policy.default.clone(cte_type="7bit"))
+        )
 
     async def send_email(self, to: str, subject: str, html_content: str, context: str = "") -> Dict:
         """Send email via SMTP"""
         try:
             # Create message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = self.smtp_username
-            msg['To'] = to
+            msg = self._build_message(to, subject, html_content)
 
-            # Add HTML content
-            html_part = MIMEText(html_content, 'html')
-            msg.attach(html_part)
-
-            # Send email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
+            # Send email over a pooled connection
+            pooled = await self._acquire()
+            try:
+                await self._send_with_retry(lambda: pooled.conn.send_message(msg), to)
+            except Exception as e:
+                await self._release(pooled, failed=_connection_lost(e))
+                raise
+            except BaseException:
+                await self._release(pooled, failed=True)
+                raise
+            pooled.sent += 1
+            await self._release(pooled)
 
             return {
                 "success": True,
@@ -80,77 +405,222 @@ class EmailOrchestrator:
             }
 
         except Exception as e:
-            raise ValueError(f"Failed to send email: {str(e)}")
+            logger.exception("send_email failed to=%s", to)
+            raise ValueError(f"Failed to send email: {e}") from e
+
+    async def _bounded_send(self, pending: Iterator[str], failed: List[Tuple[str, str]],
+                            connect_errors: List[Exception], raw: SerializedMessage, context: str) -> int:
+        """Send to recipients pulled from a shared iterator, one pooled connection at a time.
+
+        Returns how many were sent; message-level failures are appended to failed as
+        (recipient, error). If no connection can be acquired the error goes to
+        connect_errors and every worker stops, rather than retrying the connect and
+        login once per remaining recipient.
+        """
+        sent_count = 0
+
+        pooled = None
+
+        try:
+            for recipient in pending:
+                if connect_errors:
+                    break
+
+                # Hand the connection back once it hits its message cap
+                # Clear pooled before awaiting so a cancellation cannot release it twice
+                if pooled is not None and pooled.sent >= MAX_MESSAGES_PER_CONNECTION:
+                    capped, pooled = pooled, None
+                    await self._release(capped)
+
+                if pooled is None:
+                    try:
+                        pooled = await self._acquire()
+                    except Exception as e:
+                        logger.exception("send_bulk could not get an SMTP connection context=%s", context)
+                        connect_errors.append(e)
+                        break
+
+                try:
+                    if pooled.conn.supports_extension("8BITMIME"):
+                        body, mail_options = raw.eight_bit, ["BODY=8BITMIME"]
+                    else:
+                        body, mail_options = raw.seven_bit, []
+
+                    # Header lines never start with "To: " apart from the To header,
+                    # and it comes before the body, so the first match is the header
+                    patched = body.replace(_TO_PLACEHOLDER_LINE, b"\nTo: " + recipient.encode(), 1)
+
+                    await self._send_with_retry(
+                        lambda: pooled.conn.sendmail(self.smtp_username, [recipient], patched,
+                                                     mail_options=mail_options),
+                        recipient
+                    )
+                    pooled.sent += 1
+                    sent_count += 1
+
+                except Exception as e:
+                    logger.exception("send_bulk failed to=%s context=%s", recipient, context)
+                    # Keep the connection for the next recipient unless it is gone
+                    if _connection_lost(e) or not pooled.conn.is_connected:
+                        broken, pooled = pooled, None
+                        await self._release(broken, failed=True)
+                    failed.append((recipient, str(e)))
+
+        except BaseException:
+            if pooled is not None:
+                await self._release(pooled, failed=True)
+            raise
+
+        if pooled is not None:
+            await self._release(pooled)
+
+        return sent_count
+
+    async def send_bulk(self, recipients: List[str], subject: str, html_content: str, context: str = "",
+                        raw: Optional[SerializedMessage] = None) -> Tuple[int, List[Tuple[str, str]]]:
+        """Send the same email to several recipients over concurrent pooled SMTP sessions.
+
+        Message failures are reported per recipient rather than aborting the batch, and
+        the result is (sent count, [(recipient, error), ...]). Failing to connect or
+        log in to the SMTP server aborts the batch with a single ValueError. Pass raw
+        from get_prebuilt_artifact() to skip building the message.
+        """
+        failed: List[Tuple[str, str]] = []
+        connect_errors: List[Exception] = []
+        if not recipients:
+            return 0, failed
 
+        # Serialize once; workers only swap the To address per recipient
+        if raw is None:
+            raw = self._serialize_bulk(subject, html_content)
 
+        pending = iter(recipients)
+        # One worker per pooled connection; concurrent calls share the pool
+        workers = min(self.smtp_pool_size, len(recipients))
+
+        counts = await asyncio.gather(*[
+            self._bounded_send(pending, failed, connect_errors, raw, context)
+            for _ in range(workers)
+        ])
+
+        if connect_errors:
+            error = connect_errors[0]
+            raise ValueError(
+                f"Failed to send email: {error} ({sum(counts)} of {len(recipients)} recipients sent before the failure)"
+            ) from error
+
+        return sum(counts), failed
+
+
+@lru_cache(maxsize=1)
+def get_orchestrator() -> EmailOrchestrator:
+    """Create the orchestrator on first use and share it"""
+    return EmailOrchestrator()
 
-# Initialize the orchestrator
-orchestrator = EmailOrchestrator()
 
 # Create MCP server
 app = Server("email-orchestrator")
 
 
+# Tool schemas are static, so build them once at import time
+_TOOLS = [
+    types.Tool(
+        name="send_email_direct",
+        description="Send an email directly with provided content",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "to": {
+                    "type": "string",
+                    "description": "Email address to send to"
+                },
+                "subject": {
+                    "type": "string",
+                    "description": "Email subject line"
+                },
+                "html_content": {
+                    "type": "string",
+                    "description": "HTML content of the email"
+                },
+                "context": {
+                    "type": "string",
+                    "description": "Context description for logging (e.g., 'Newsletter Template to John Doe')",
+                    "default": ""
+                }
+            },
+            "required": ["to", "subject", "html_content"]
+        }
+    ),
+    types.Tool(
+        name="send_email_from_artifact",
+        description="Send an email using content from email_artifacts table in Supabase to one or multiple recipients",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "to": {
+                    "oneOf": [
+                        {
+                            "type": "string",
+                            "description": "Single email address to send to"
+                        },
+                        {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Array of email addresses to send to"
+                        }
+                    ],
+                    "description": "Email address(es) to send to - can be a single string or array of strings"
+                },
+                "artifact_id": {
+                    "type": "string",
+                    "description": "ID of the email artifact to retrieve from email_artifacts table"
+                }
+            },
+            "required": ["to", "artifact_id"]
+        }
+    )
+]
+
+
 @app.list_tools()
 async def list_tools() -> list[types.Tool]:
     """List available tools"""
-    return [
-        types.Tool(
-            name="send_email_direct",
-            description="Send an email directly with provided content",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "to": {
-                        "type": "string",
-                        "description": "Email address to send to"
-                    },
-                    "subject": {
-                        "type": "string",
-                        "description": "Email subject line"
-                    },
-                    "html_content": {
-                        "type": "string",
-                        "description": "HTML content of the email"
-                    },
-                    "context": {
-                        "type": "string",
-                        "description": "Context description for logging (e.g., 'Newsletter Template to John Doe')",
-                        "default": ""
-                    }
-                },
-                "required": ["to", "subject", "html_content"]
-            }
-        ),
-        types.Tool(
-            name="send_email_from_artifact",
-            description="Send an email using content from email_artifacts table in Supabase to one or multiple recipients",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "to": {
-                        "oneOf": [
-                            {
-                                "type": "string",
-                                "description": "Single email address to send to"
-                            },
-                            {
-                                "type": "array",
-                                "items": {"type": "string"},
-                                "description": "Array of email addresses to send to"
-                            }
-                        ],
-                        "description": "Email address(es) to send to - can be a single string or array of strings"
-                    },
-                    "artifact_id": {
-                        "type": "string",
-                        "description": "ID of the email artifact to retrieve from email_artifacts table"
-                    }
-                },
-                "required": ["to", "artifact_id"]
-            }
-        )
-    ]
+    return _TOOLS
+
+
+# Success messages returned by call_tool
+_DIRECT_TMPL = (
+    "✅ Email sent successfully!\n"
+    "To: {to}\n"
+    "Subject: {subject}\n"
+    "Context: {context}\n"
+    "Content length: {content_length} characters"
+)
+_ARTIFACT_TMPL = (
+    "✅ Email sent from artifact!\n"
+    "To: {to}\n"
+    "Subject: {subject}\n"
+    "Artifact ID: {artifact_id}\n"
+    "Artifact Title: {title}\n"
+    "Content length: {content_length} characters"
+)
+_ARTIFACT_BULK_TMPL = (
+    "✅ Email sent from artifact to {total} recipients!\n"
+    "To: {to}\n"
+    "Subject: {subject}\n"
+    "Artifact ID: {artifact_id}\n"
+    "Artifact Title: {title}\n"
+    "Content length: {content_length} characters"
+)
+_ARTIFACT_PARTIAL_TMPL = (
+    "⚠️ Email sent from artifact to {sent_count} of {total} recipients\n"
+    "To: {to}\n"
+    "Failed: {failed}\n"
+    "Subject: {subject}\n"
+    "Artifact ID: {artifact_id}\n"
+    "Artifact Title: {title}\n"
+    "Content length: {content_length} characters"
+)
 
 
 @app.call_tool()
@@ -160,6 +630,8 @@ async def call_tool(
     """Handle tool calls"""
     
     try:
+        orchestrator = get_orchestrator()
+
         if name == "send_email_direct":
             to = arguments["to"]
             subject = arguments["subject"]
@@ -170,58 +642,58 @@ async def call_tool(
             
             return [types.TextContent(
                 type="text",
-                text=f"✅ Email sent successfully!\n"
-                     f"To: {result['to']}\n"
-                     f"Subject: {result['subject']}\n"
-                     f"Context: {result['context']}\n"
-                     f"Content length: {result['content_length']} characters"
+                text=_DIRECT_TMPL.format_map(result)
             )]
 
         elif name == "send_email_from_artifact":
             to = arguments["to"]
             artifact_id = arguments["artifact_id"]
             
-            # Get email artifact from Supabase
-            artifact = await orchestrator.get_email_artifact(artifact_id)
-            
-            # Extract email content from artifact
-            subject = artifact.get("title", "")
-            html_content = artifact.get("html_template", "")
-            
-            if not subject or not html_content:
-                raise ValueError("Email artifact missing required fields: title or html_template")
+            # Handle multiple recipients, dropping duplicates but keeping order
+            recipients = list(dict.fromkeys(to if isinstance(to, list) else [to]))
+            if not recipients:
+                raise ValueError("At least one recipient is required")
+            invalid = [r for r in recipients if not _EMAIL_RE.fullmatch(r)]
+            if invalid:
+                raise ValueError(f"Invalid email address(es): {', '.join(invalid)}")
             
-            # Handle multiple recipients
-            recipients = to if isinstance(to, list) else [to]
-            results = []
+            # Get email artifact from Supabase, with its message pre-serialized
+            subject, html_content, raw = await orchestrator.get_prebuilt_artifact(artifact_id)
             
-            for recipient in recipients:
-                result = await orchestrator.send_email(recipient, subject, html_content, f"Email from artifact {artifact_id}")
-                results.append(result)
+            sent_count, failed = await orchestrator.send_bulk(
+                recipients, subject, html_content, f"Email from artifact {artifact_id}", raw=raw
+            )
             
+            if not sent_count:
+                errors = "; ".join(f"{r}: {error}" for r, error in failed)
+                raise ValueError(f"Failed to send email: {errors}")
+
             # Format response for multiple recipients
+            fields = {
+                "artifact_id": artifact_id,
+                "title": subject,
+                "subject": subject,
+                "content_length": len(html_content)
+            }
             if len(recipients) == 1:
-                result = results[0]
-                return [types.TextContent(
-                    type="text",
-                    text=f"✅ Email sent from artifact!\n"
-                         f"To: {result['to']}\n"
-                         f"Subject: {result['subject']}\n"
-                         f"Artifact ID: {artifact_id}\n"
-                         f"Artifact Title: {artifact.get('title', 'Unknown')}\n"
-                         f"Content length: {result['content_length']} characters"
-                )]
+                text = _ARTIFACT_TMPL.format_map({**fields, "to": recipients[0]})
+            elif failed:
+                failed_to = {r for r, _ in failed}
+                text = _ARTIFACT_PARTIAL_TMPL.format_map({
+                    **fields,
+                    "sent_count": sent_count,
+                    "total": len(recipients),
+                    "to": ", ".join(r for r in recipients if r not in failed_to),
+                    "failed": ", ".join(f"{r} ({error})" for r, error in failed)
+                })
             else:
-                recipient_list = ", ".join([r['to'] for r in results])
-                return [types.TextContent(
-                    type="text",
-                    text=f"✅ Email sent from artifact to {len(recipients)} recipients!\n"
-                         f"To: {recipient_list}\n"
-                         f"Subject: {results[0]['subject']}\n"
-                         f"Artifact ID: {artifact_id}\n"
-                         f"Artifact Title: {artifact.get('title', 'Unknown')}\n"
-                         f"Content length: {results[0]['content_length']} characters"
-                )]
+                text = _ARTIFACT_BULK_TMPL.format_map({
+                    **fields,
+                    "total": len(recipients),
+                    "to": ", ".join(recipients)
+                })
+
+            return [types.TextContent(type="text", text=text)]
 
         else:
             raise ValueError(f"Unknown tool: {name}")
@@ -244,4 +716,11 @@ async def main():
 
 
 if __name__ == "__main__":
+    # Use libuv's event loop when available; not supported on Windows
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
     asyncio.run(main())